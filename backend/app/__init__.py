@@ -12,22 +12,92 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
+    # Resumable uploads are sent in chunks that each fit under MAX_CONTENT_LENGTH
+    app.config['UPLOAD_STAGING_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], '.staging')
+    app.config['UPLOAD_CHUNK_SIZE'] = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # 8MB per chunk
+    app.config['MAX_RESUMABLE_UPLOAD_SIZE'] = int(os.environ.get('MAX_RESUMABLE_UPLOAD_SIZE', 256 * 1024 * 1024))  # 256MB
+    app.config['UPLOAD_SESSION_TTL'] = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 3600))  # idle seconds before expiry
+    # Ingest optimization: strip metadata and recompress stored images
+    app.config['IMAGE_OPTIMIZATION'] = os.environ.get('IMAGE_OPTIMIZATION', '1').lower() in ('1', 'true', 'yes')
+    app.config['IMAGE_JPEG_QUALITY'] = int(os.environ.get('IMAGE_JPEG_QUALITY', 90))  # only used when pixels change
+    # Progressive/optimized re-encode of untouched JPEGs; smaller but not lossless, so off by default
+    app.config['IMAGE_JPEG_REENCODE'] = os.environ.get('IMAGE_JPEG_REENCODE', '0').lower() in ('1', 'true', 'yes')
+    app.config['IMAGE_PNG_COMPRESS_LEVEL'] = int(os.environ.get('IMAGE_PNG_COMPRESS_LEVEL', 9))
+    app.config['IMAGE_KEEP_ICC_PROFILE'] = os.environ.get('IMAGE_KEEP_ICC_PROFILE', '1').lower() in ('1', 'true', 'yes')
+    # Rendered listing/search responses, keyed by query and catalog version (0 disables)
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+    app.config['RESPONSE_CACHE_COMPRESS_MIN_BYTES'] = int(os.environ.get('RESPONSE_CACHE_COMPRESS_MIN_BYTES', 1024))
+    # Storage reconciliation (orphaned files, dangling records); interval 0 disables the background thread
+    app.config['RECONCILE_INTERVAL'] = int(os.environ.get('RECONCILE_INTERVAL', 0))
+    app.config['RECONCILE_BATCH_SIZE'] = int(os.environ.get('RECONCILE_BATCH_SIZE', 500))
+    app.config['RECONCILE_BATCH_PAUSE'] = float(os.environ.get('RECONCILE_BATCH_PAUSE', 0.05))
+    app.config['RECONCILE_GRACE_PERIOD'] = int(os.environ.get('RECONCILE_GRACE_PERIOD', 3600))
+    app.config['RECONCILE_QUARANTINE'] = os.environ.get('RECONCILE_QUARANTINE', '0').lower() in ('1', 'true', 'yes')
+    app.config['RECONCILE_QUARANTINE_RETENTION'] = int(os.environ.get('RECONCILE_QUARANTINE_RETENTION', 7 * 24 * 3600))
+    # Admission control: token bucket limits per client IP / user, and a cap on concurrent image processing
+    app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    app.config['RATE_LIMIT_STORAGE'] = os.environ.get('RATE_LIMIT_STORAGE', 'memory')  # or "module:factory"
+    # Number of reverse proxies in front of the app whose X-Forwarded-For/-Proto headers are trusted
+    app.config['TRUSTED_PROXY_COUNT'] = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    app.config['RATE_LIMIT_AUTH'] = os.environ.get('RATE_LIMIT_AUTH', '10/minute')
+    app.config['RATE_LIMIT_UPLOAD'] = os.environ.get('RATE_LIMIT_UPLOAD', '20/minute')
+    app.config['RATE_LIMIT_UPLOAD_CHUNK'] = os.environ.get('RATE_LIMIT_UPLOAD_CHUNK', '600/minute')
+    app.config['IMAGE_PROCESSING_CONCURRENCY'] = int(os.environ.get('IMAGE_PROCESSING_CONCURRENCY', os.cpu_count() or 2))
+    app.config['IMAGE_PROCESSING_QUEUE_TIMEOUT'] = float(os.environ.get('IMAGE_PROCESSING_QUEUE_TIMEOUT', 2.0))  # seconds
+    app.config['IMAGE_PROCESSING_RETRY_AFTER'] = int(os.environ.get('IMAGE_PROCESSING_RETRY_AFTER', 5))  # seconds
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    # Preload PIL and the catalogs in the background right after startup
+    app.config['WARMUP_ON_START'] = os.environ.get('WARMUP_ON_START', '0').lower() in ('1', 'true', 'yes')
+    # Opt-in request profiling: a fraction of requests and/or requests with a signed X-Profile-Token header
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    app.config['PROFILE_SECRET'] = os.environ.get('PROFILE_SECRET')
+    app.config['PROFILE_INTERVAL'] = float(os.environ.get('PROFILE_INTERVAL', 0.005))  # seconds between samples
+    app.config['PROFILE_FOLDER'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles')
+    app.config['PROFILE_MAX_FILES'] = int(os.environ.get('PROFILE_MAX_FILES', 50))
     
     # Initialize extensions with CORS support for multiple origins
     cors_origins = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://localhost:3001')
     CORS(app, resources={r"/api/*": {"origins": cors_origins.split(','), "supports_credentials": True}})
     jwt = JWTManager(app)
     
+    if app.config['TRUSTED_PROXY_COUNT'] > 0:
+        # Take the client address from the proxies' headers (used for rate limiting)
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'],
+                                x_proto=app.config['TRUSTED_PROXY_COUNT'])
+    
+    from .utils.rate_limit import init_rate_limiting
+    init_rate_limiting(app)
+    
+    if app.config['RESPONSE_CACHE_SIZE'] > 0:
+        from .utils.response_cache import ResponseCache
+        app.extensions['response_cache'] = ResponseCache(
+            app.config['RESPONSE_CACHE_SIZE'], app.config['RESPONSE_CACHE_COMPRESS_MIN_BYTES'])
+    
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['UPLOAD_STAGING_FOLDER'], exist_ok=True)
     
     # Register blueprints
     from .routes.auth import auth_bp
     from .routes.uploads import uploads_bp
+    from .routes.upload_sessions import upload_sessions_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(uploads_bp, url_prefix='/api/uploads')
+    app.register_blueprint(upload_sessions_bp, url_prefix='/api/uploads/sessions')
+    
+    # Request profiling hooks (no-op unless enabled above)
+    from .utils.profiling import init_profiling
+    init_profiling(app)
+    
+    if app.config['RECONCILE_INTERVAL'] > 0:
+        from .utils.reconcile import start_reconciler
+        start_reconciler(app)
+    
+    if app.config['WARMUP_ON_START']:
+        from .utils.startup import start_warm_up
+        start_warm_up(app)
     
     return app 
\ No newline at end of file
@@ -1,18 +1,32 @@
 import uuid
 import json
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
 
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock is available
+    fcntl = None
+
 class Image:
     """Model for representing uploaded images"""
     
     # File path for storing image metadata (simple JSON-based storage)
     IMAGES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'static', 'images.json')
     
+    # Bumped on every write so cached listings can be invalidated
+    _catalog_version = 0
+    
+    # Serialises read-modify-write cycles of the catalog within this process
+    _catalog_lock = threading.Lock()
+    
     def __init__(self, id: str = None, title: str = None, description: str = None, 
                  filename: str = None, user_id: str = None, path: str = None, 
-                 created_at: str = None, price: float = None, category: str = None):
+                 created_at: str = None, price: float = None, category: str = None,
+                 original_size: int = None, stored_size: int = None):
         self.id = id or str(uuid.uuid4())
         self.title = title
         self.description = description
@@ -23,6 +37,9 @@ class Image:
         self.category = category or "other"
         self.created_at = created_at or datetime.now().isoformat()
         self.rating = round(float(uuid.uuid4().int % 2) + 3, 1)  # Random rating between 3.0 and 5.0
+        # Bytes uploaded vs. bytes stored after ingest optimization
+        self.original_size = original_size
+        self.stored_size = stored_size
     
     def to_dict(self) -> Dict:
         """Convert image object to dictionary (for storage)"""
@@ -36,6 +53,8 @@ class Image:
             'price': self.price,
             'category': self.category,
             'rating': self.rating,
+            'original_size': self.original_size,
+            'stored_size': self.stored_size,
             'created_at': self.created_at
         }
     
@@ -51,14 +70,20 @@ class Image:
             path=data.get('path'),
             price=data.get('price'),
             category=data.get('category'),
-            created_at=data.get('created_at')
+            created_at=data.get('created_at'),
+            original_size=data.get('original_size'),
+            stored_size=data.get('stored_size')
         )
         image.rating = data.get('rating', 4.0)
         return image
     
     @classmethod
-    def get_all_images(cls) -> List['Image']:
-        """Get all images from storage"""
+    def get_all_images(cls, strict: bool = False) -> List['Image']:
+        """Get all images from storage
+        
+        With strict=True an unreadable catalog raises json.JSONDecodeError
+        instead of looking empty, for callers that delete based on it.
+        """
         if not os.path.exists(cls.IMAGES_FILE):
             return []
         
@@ -66,7 +91,11 @@ class Image:
             with open(cls.IMAGES_FILE, 'r') as f:
                 images_data = json.load(f)
             return [cls.from_dict(image_data) for image_data in images_data]
-        except (json.JSONDecodeError, FileNotFoundError):
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError:
+            if strict:
+                raise
             return []
     
     @classmethod
@@ -76,8 +105,49 @@ class Image:
         os.makedirs(os.path.dirname(cls.IMAGES_FILE), exist_ok=True)
         
         images_data = [image.to_dict() for image in images]
-        with open(cls.IMAGES_FILE, 'w') as f:
+        
+        # Write a temp file and swap it in so readers never see a partial catalog
+        temp_path = f"{cls.IMAGES_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
             json.dump(images_data, f, indent=2)
+        os.replace(temp_path, cls.IMAGES_FILE)
+        Image._catalog_version += 1
+    
+    @classmethod
+    @contextmanager
+    def catalog_lock(cls):
+        """
+        Hold the catalog for a read-modify-write cycle
+        
+        Takes the in-process lock and an exclusive flock on a sidecar lock
+        file, so writers in other worker processes wait as well.
+        """
+        with cls._catalog_lock:
+            if fcntl is None:
+                yield
+                return
+            
+            os.makedirs(os.path.dirname(cls.IMAGES_FILE), exist_ok=True)
+            with open(f"{cls.IMAGES_FILE}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    @classmethod
+    def get_catalog_version(cls) -> tuple:
+        """
+        Version of the catalog, changes whenever it is written
+        
+        The in-process counter covers writes from this process and the
+        file's modification time covers writes from other workers.
+        """
+        try:
+            mtime = os.stat(cls.IMAGES_FILE).st_mtime_ns
+        except OSError:
+            mtime = 0
+        return (Image._catalog_version, mtime)
     
     @classmethod
     def get_by_id(cls, image_id: str) -> Optional['Image']:
@@ -114,33 +184,37 @@ class Image:
     
     def save(self) -> None:
         """Save the current image to storage"""
-        images = self.get_all_images()
-        
-        # Update existing image or add new one
-        found = False
-        for i, image in enumerate(images):
-            if image.id == self.id:
-                images[i] = self
-                found = True
-                break
-        
-        if not found:
-            images.append(self)
-        
-        self.save_all_images(images)
+        with self.catalog_lock():
+            images = self.get_all_images()
+            
+            # Update existing image or add new one
+            found = False
+            for i, image in enumerate(images):
+                if image.id == self.id:
+                    images[i] = self
+                    found = True
+                    break
+            
+            if not found:
+                images.append(self)
+            
+            self.save_all_images(images)
     
     def delete(self) -> bool:
         """Delete the current image from storage"""
-        images = self.get_all_images()
-        initial_count = len(images)
-        
-        # Remove the image if it exists
-        images = [image for image in images if image.id != self.id]
+        with self.catalog_lock():
+            images = self.get_all_images()
+            initial_count = len(images)
+            
+            # Remove the image if it exists
+            images = [image for image in images if image.id != self.id]
+            
+            removed = len(images) < initial_count
+            if removed:
+                self.save_all_images(images)
         
         # Check if an image was removed
-        if len(images) < initial_count:
-            self.save_all_images(images)
-            
+        if removed:
             # Try to remove the actual file
             if self.path and os.path.exists(self.path):
                 try:
@@ -0,0 +1,152 @@
+import uuid
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class UploadSession:
+    """Model for a resumable (chunked) upload that is still in progress"""
+
+    # Folder holding one JSON file per session, so concurrent uploads never
+    # rewrite each other's records
+    SESSIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'static', 'upload_sessions')
+    
+    # Serialises writes and deletes of session files within this process
+    _write_lock = threading.Lock()
+
+    def __init__(self, id: str = None, user_id: str = None, filename: str = None,
+                 total_size: int = None, checksum: str = None, staging_path: str = None,
+                 title: str = None, description: str = None, category: str = None,
+                 price: float = None, created_at: str = None, updated_at: str = None):
+        self.id = id or uuid.uuid4().hex
+        self.user_id = user_id
+        self.filename = filename
+        self.total_size = total_size
+        self.checksum = checksum
+        self.staging_path = staging_path
+        self.title = title
+        self.description = description
+        self.category = category
+        self.price = price
+        self.created_at = created_at or datetime.now().isoformat()
+        self.updated_at = updated_at or self.created_at
+
+    @property
+    def offset(self) -> int:
+        """Number of bytes received so far (the staging file is the source of truth)"""
+        if self.staging_path and os.path.exists(self.staging_path):
+            return os.path.getsize(self.staging_path)
+        return 0
+
+    @property
+    def last_activity(self) -> float:
+        """Timestamp of the last write to the session or its staging file
+
+        Chunks only append to the staging file, so its mtime tracks progress
+        without rewriting the session record on every PUT.
+        """
+        timestamp = datetime.fromisoformat(self.updated_at).timestamp() if self.updated_at else 0
+        if self.staging_path and os.path.exists(self.staging_path):
+            timestamp = max(timestamp, os.path.getmtime(self.staging_path))
+        return timestamp
+
+    def to_dict(self) -> Dict:
+        """Convert session object to dictionary (for storage)"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'filename': self.filename,
+            'total_size': self.total_size,
+            'checksum': self.checksum,
+            'staging_path': self.staging_path,
+            'title': self.title,
+            'description': self.description,
+            'category': self.category,
+            'price': self.price,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'UploadSession':
+        """Create session object from dictionary"""
+        return cls(
+            id=data.get('id'),
+            user_id=data.get('user_id'),
+            filename=data.get('filename'),
+            total_size=data.get('total_size'),
+            checksum=data.get('checksum'),
+            staging_path=data.get('staging_path'),
+            title=data.get('title'),
+            description=data.get('description'),
+            category=data.get('category'),
+            price=data.get('price'),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at')
+        )
+
+    @classmethod
+    def _session_file(cls, session_id: str) -> Optional[str]:
+        """Path of the file storing a session, or None for a malformed ID"""
+        if not re.match(r'^[0-9a-f]{32}$', session_id or ''):
+            return None
+        return os.path.join(cls.SESSIONS_DIR, f"{session_id}.json")
+
+    @classmethod
+    def _load(cls, path: str) -> Optional['UploadSession']:
+        """Read one session file"""
+        try:
+            with open(path, 'r') as f:
+                return cls.from_dict(json.load(f))
+        except (json.JSONDecodeError, FileNotFoundError):
+            return None
+
+    @classmethod
+    def get_all_sessions(cls) -> List['UploadSession']:
+        """Get all sessions from storage"""
+        if not os.path.isdir(cls.SESSIONS_DIR):
+            return []
+
+        sessions = []
+        for name in os.listdir(cls.SESSIONS_DIR):
+            if name.endswith('.json'):
+                session = cls._load(os.path.join(cls.SESSIONS_DIR, name))
+                if session:
+                    sessions.append(session)
+        return sessions
+
+    @classmethod
+    def get_by_id(cls, session_id: str) -> Optional['UploadSession']:
+        """Find session by ID"""
+        path = cls._session_file(session_id)
+        return cls._load(path) if path else None
+
+    def save(self) -> None:
+        """Save the current session to storage"""
+        # Create directory if it doesn't exist
+        os.makedirs(self.SESSIONS_DIR, exist_ok=True)
+        self.updated_at = datetime.now().isoformat()
+
+        # Write a temp file and swap it in so readers never see a partial file
+        path = self._session_file(self.id)
+        with self._write_lock:
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(temp_path, path)
+
+    def delete(self, remove_staging_file: bool = True) -> None:
+        """Remove the session record and (optionally) its staging file"""
+        with self._write_lock:
+            try:
+                os.remove(self._session_file(self.id))
+            except OSError:
+                pass  # Already removed
+
+        if remove_staging_file and self.staging_path and os.path.exists(self.staging_path):
+            try:
+                os.remove(self.staging_path)
+            except OSError:
+                pass  # Staging file will be picked up as an orphan later
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.models.user import User
+from app.utils.rate_limit import rate_limit
 from werkzeug.exceptions import BadRequest, Unauthorized, Conflict
 import re
 import uuid
@@ -8,6 +9,7 @@ import uuid
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('auth')
 def register():
     """Register a new user"""
     data = request.get_json()
@@ -50,6 +52,7 @@ def register():
     }), 201
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('auth')
 def login():
     """Login a user - accepts any credentials for demo"""
     data = request.get_json()
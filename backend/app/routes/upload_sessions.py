@@ -0,0 +1,277 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import BadRequest, NotFound, Unauthorized, Conflict, HTTPException
+from app.models.upload_session import UploadSession
+from app.models.user import User
+from app.utils.rate_limit import rate_limit
+from app.routes.uploads import ALLOWED_EXTENSIONS, allowed_file, _unique_filename, _finalize_stored_image
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock is available
+    fcntl = None
+
+upload_sessions_bp = Blueprint('upload_sessions', __name__)
+
+# Read the request body / staging file in blocks of this size
+COPY_BLOCK_SIZE = 64 * 1024
+
+# Content-Range: bytes <start>-<end>/<total>
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+# Serialise appends to the same staging file within this process
+_session_locks = {}
+_session_locks_guard = threading.Lock()
+
+def _session_lock(session_id):
+    """Get (or create) the append lock for a session"""
+    with _session_locks_guard:
+        return _session_locks.setdefault(session_id, threading.Lock())
+
+@contextmanager
+def _locked_staging_file(session):
+    """Open a session's staging file with an exclusive lock held
+
+    The in-process lock covers other threads and the flock other worker
+    processes, so a retried chunk that reaches a second worker while the
+    first copy is still streaming can't append the same bytes twice.
+    Raises NotFound if the upload was completed or aborted meanwhile.
+    """
+    with _session_lock(session.id):
+        try:
+            staging = open(session.staging_path, 'r+b')
+        except FileNotFoundError:
+            raise NotFound('Upload session not found')
+
+        with staging:
+            if fcntl is not None:
+                fcntl.flock(staging, fcntl.LOCK_EX)
+                # Another worker may have completed the upload (moving the
+                # file away) while we waited for the lock
+                try:
+                    moved = os.stat(session.staging_path).st_ino != os.fstat(staging.fileno()).st_ino
+                except FileNotFoundError:
+                    moved = True
+                if moved:
+                    raise NotFound('Upload session not found')
+            yield staging
+
+def _get_owned_session(session_id, user_id):
+    """Load a session and make sure it belongs to the current user"""
+    session = UploadSession.get_by_id(session_id)
+    if not session:
+        raise NotFound('Upload session not found')
+    if session.user_id != user_id:
+        raise Unauthorized('You are not authorized to access this upload session')
+    return session
+
+def _session_status(session):
+    """Progress payload returned by every session endpoint"""
+    offset = session.offset
+    return {
+        'id': session.id,
+        'filename': session.filename,
+        'offset': offset,
+        'total_size': session.total_size,
+        'complete': offset == session.total_size,
+        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE'],
+        'created_at': session.created_at,
+        'updated_at': datetime.fromtimestamp(session.last_activity).isoformat()
+    }
+
+@upload_sessions_bp.route('', methods=['POST'])
+@jwt_required()
+@rate_limit('upload', per_identity=True)
+def create_session():
+    """Start a resumable upload"""
+    user_id = get_jwt_identity()
+
+    # Check if user exists
+    user = User.get_by_id(user_id)
+    if not user:
+        raise Unauthorized('User not found')
+
+    data = request.get_json() or {}
+
+    # Validate required fields
+    if not all(key in data for key in ['filename', 'total_size', 'checksum']):
+        raise BadRequest('Missing required fields: filename, total_size and checksum are required')
+
+    if not allowed_file(data['filename']):
+        raise BadRequest(f'File type not allowed. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}')
+
+    # Reject names that don't survive secure_filename now, not after the upload
+    _unique_filename(data['filename'])
+
+    try:
+        total_size = int(data['total_size'])
+    except (ValueError, TypeError):
+        raise BadRequest('total_size must be an integer')
+
+    max_size = current_app.config['MAX_RESUMABLE_UPLOAD_SIZE']
+    if total_size <= 0 or total_size > max_size:
+        raise BadRequest(f'total_size must be between 1 and {max_size} bytes')
+
+    # Only SHA-256 is supported; accept an optional "sha256:" prefix
+    checksum = str(data['checksum']).lower()
+    if checksum.startswith('sha256:'):
+        checksum = checksum[len('sha256:'):]
+    if not re.match(r'^[0-9a-f]{64}$', checksum):
+        raise BadRequest('checksum must be a hex encoded SHA-256 digest')
+
+    price = None
+    if data.get('price') is not None:
+        try:
+            price = float(data['price'])
+        except (ValueError, TypeError):
+            raise BadRequest('Price must be a number')
+
+    session = UploadSession(
+        user_id=user_id,
+        filename=data['filename'],
+        total_size=total_size,
+        checksum=checksum,
+        title=data.get('title', 'Untitled'),
+        description=data.get('description', ''),
+        category=data.get('category', 'other'),
+        price=price
+    )
+    session.staging_path = os.path.join(current_app.config['UPLOAD_STAGING_FOLDER'], f"{session.id}.part")
+
+    # Create an empty staging file so the offset starts at zero
+    open(session.staging_path, 'wb').close()
+    session.save()
+
+    return jsonify(_session_status(session)), 201
+
+@upload_sessions_bp.route('/<session_id>', methods=['GET'])
+@jwt_required()
+def get_session(session_id):
+    """Query how many bytes of a resumable upload have been received"""
+    session = _get_owned_session(session_id, get_jwt_identity())
+    return jsonify(_session_status(session))
+
+@upload_sessions_bp.route('/<session_id>', methods=['PUT'])
+@jwt_required()
+@rate_limit('upload_chunk', per_identity=True)
+def upload_chunk(session_id):
+    """Append a chunk to a resumable upload
+
+    The chunk offset is given with a ``Content-Range: bytes start-end/total``
+    header and must equal the number of bytes already received, so a client
+    that lost a response can query the session and resume from there.
+    """
+    session = _get_owned_session(session_id, get_jwt_identity())
+
+    match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        raise BadRequest('Content-Range header of the form "bytes start-end/total" is required')
+
+    start, end, total = int(match.group(1)), int(match.group(2)), match.group(3)
+    length = end - start + 1
+
+    if total != '*' and int(total) != session.total_size:
+        raise BadRequest('Content-Range total does not match the session size')
+    if length <= 0 or end >= session.total_size:
+        raise BadRequest('Content-Range is outside the upload')
+    if length > current_app.config['UPLOAD_CHUNK_SIZE']:
+        raise BadRequest(f"Chunks may not exceed {current_app.config['UPLOAD_CHUNK_SIZE']} bytes")
+    if request.content_length is not None and request.content_length != length:
+        raise BadRequest('Content-Length does not match Content-Range')
+
+    with _locked_staging_file(session) as staging:
+        offset = os.fstat(staging.fileno()).st_size
+        if start != offset:
+            response = jsonify({'error': 'Chunk offset does not match the upload progress', **_session_status(session)})
+            response.status_code = Conflict.code
+            return response
+
+        # Stream the body straight onto the end of the staging file
+        written = 0
+        staging.seek(offset)
+        try:
+            while written < length:
+                block = request.stream.read(min(COPY_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                staging.write(block)
+                written += len(block)
+        finally:
+            # Drop a short write (or a dropped connection) so the client can retry the whole chunk
+            if written != length:
+                staging.truncate(offset)
+
+        if written != length:
+            raise BadRequest('Chunk body is shorter than its Content-Range')
+
+    return jsonify(_session_status(session))
+
+@upload_sessions_bp.route('/<session_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_session(session_id):
+    """Verify the checksum of a fully received upload and store the image"""
+    user_id = get_jwt_identity()
+    session = _get_owned_session(session_id, user_id)
+
+    with _locked_staging_file(session) as staging:
+        if os.fstat(staging.fileno()).st_size != session.total_size:
+            response = jsonify({'error': 'Upload is not complete', **_session_status(session)})
+            response.status_code = Conflict.code
+            return response
+
+        digest = hashlib.sha256()
+        for block in iter(lambda: staging.read(COPY_BLOCK_SIZE), b''):
+            digest.update(block)
+
+        if digest.hexdigest() != session.checksum:
+            # The data is corrupt; start over rather than keep appending to it
+            staging.truncate(0)
+            session.save()
+            response = jsonify({'error': 'Checksum mismatch, upload has been reset', **_session_status(session)})
+            response.status_code = Conflict.code
+            return response
+
+        unique_filename = _unique_filename(session.filename)
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+        if fcntl is None:
+            staging.close()  # Windows can't rename an open file
+        # Still holding the lock, so a late chunk finds the file gone
+        os.replace(session.staging_path, file_path)
+        # The mtime is still that of the last chunk; refresh it so the
+        # reconciler's grace period covers the rest of this request
+        os.utime(file_path)
+
+        try:
+            response = _finalize_stored_image(file_path, unique_filename, user_id, session.title,
+                                              session.description, session.category, session.price)
+        except HTTPException:
+            # Shed under load (503): put the data back so the client can retry /complete
+            os.replace(file_path, session.staging_path)
+            raise
+
+        session.delete(remove_staging_file=False)
+
+    with _session_locks_guard:
+        _session_locks.pop(session.id, None)
+
+    return response
+
+@upload_sessions_bp.route('/<session_id>', methods=['DELETE'])
+@jwt_required()
+def abort_session(session_id):
+    """Abandon a resumable upload and discard the received bytes"""
+    session = _get_owned_session(session_id, get_jwt_identity())
+
+    with _session_lock(session.id):
+        session.delete()
+
+    with _session_locks_guard:
+        _session_locks.pop(session.id, None)
+
+    return jsonify({'message': 'Upload session deleted successfully'})
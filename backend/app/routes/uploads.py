@@ -1,12 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
-from werkzeug.exceptions import BadRequest, NotFound, Unauthorized
+from werkzeug.exceptions import BadRequest, NotFound, Unauthorized, HTTPException
 from app.models.image import Image
 from app.models.user import User
+from app.utils.helpers import optimize_image
+from app.utils.rate_limit import rate_limit, image_processing_slot
 import os
 import uuid
-from PIL import Image as PILImage
 from datetime import datetime
 
 uploads_bp = Blueprint('uploads', __name__)
@@ -20,6 +21,7 @@ def allowed_file(filename):
 
 @uploads_bp.route('', methods=['POST'])
 @jwt_required()
+@rate_limit('upload', per_identity=True)
 def upload_image():
     """Upload a new image"""
     user_id = get_jwt_identity()
@@ -58,9 +60,7 @@ def upload_image():
             print(f"Invalid price value: {request.form.get('price')}")
     
     # Secure the filename and add a UUID to avoid collisions
-    original_filename = secure_filename(file.filename)
-    filename_parts = original_filename.rsplit('.', 1)
-    unique_filename = f"{filename_parts[0]}_{uuid.uuid4().hex}.{filename_parts[1]}"
+    unique_filename = _unique_filename(file.filename)
     
     # Create the upload path
     upload_folder = current_app.config['UPLOAD_FOLDER']
@@ -70,93 +70,199 @@ def upload_image():
         # Save the file
         file.save(file_path)
         
-        # Create thumbnail (optional)
-        try:
-            with PILImage.open(file_path) as img:
-                # Resize image if it's too large (optional)
-                max_size = (1920, 1080)
-                if img.width > max_size[0] or img.height > max_size[1]:
-                    img.thumbnail(max_size, PILImage.LANCZOS)
-                    img.save(file_path)
-        except Exception as e:
-            print(f"Error processing image: {e}")
-            # Continue even if thumbnail creation fails
-        
-        # Save the image metadata
-        image = Image(
-            title=title,
-            description=description,
-            filename=unique_filename,
-            user_id=user_id,
-            path=file_path,
-            category=category,
-            price=price
-        )
-        image.save()
-        
-        # Generate URLs for the frontend
-        host_url = request.host_url.rstrip('/')
-        image_url = f"{host_url}/api/uploads/{image.id}"
-        thumbnail_url = f"{host_url}/api/uploads/{image.id}/thumbnail"
-        
-        return jsonify({
-            'message': 'Image uploaded successfully',
-            'image': {
-                'id': image.id,
-                'title': image.title,
-                'description': image.description,
-                'url': image_url,
-                'thumbnail_url': thumbnail_url,
-                'category': image.category,
-                'filename': image.filename,
-                'created_at': image.created_at
-            }
-        }), 201
+        return _finalize_stored_image(file_path, unique_filename, user_id, title,
+                                      description, category, price)
         
+    except HTTPException:
+        # Load shedding (503) and the like; pass them on, but don't keep the file
+        _remove_quietly(file_path)
+        raise
     except Exception as e:
         # Handle errors
         print(f"Error uploading image: {e}")
+        # Don't leave a file behind without metadata
+        _remove_quietly(file_path)
         raise BadRequest('Error uploading image')
 
+def _remove_quietly(file_path):
+    """Remove a file that has no metadata record, if it exists"""
+    if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass  # The reconciler will pick it up as an orphan
+
+def _unique_filename(filename):
+    """Secure an uploaded filename and add a UUID to avoid collisions"""
+    original_filename = secure_filename(filename)
+    
+    # secure_filename drops non-ASCII characters, so "日本.jpg" becomes "jpg"
+    if not allowed_file(original_filename) or original_filename.startswith('.'):
+        raise BadRequest('Invalid filename, please rename the file using letters and digits')
+    
+    filename_parts = original_filename.rsplit('.', 1)
+    return f"{filename_parts[0]}_{uuid.uuid4().hex}.{filename_parts[1]}"
+
+def _finalize_stored_image(file_path, unique_filename, user_id, title, description, category, price):
+    """Post-process a file already in the upload folder and record its metadata
+    
+    Raises ServiceUnavailable (before touching the file) when all image
+    processing slots stay busy.
+    """
+    original_size = os.path.getsize(file_path)
+    stored_size = original_size
+    
+    # Only the PIL work holds a processing slot, not the upload itself
+    with image_processing_slot():
+        if current_app.config['IMAGE_OPTIMIZATION']:
+            # Strip metadata and recompress; pixels are only re-encoded when rotated or downscaled
+            try:
+                original_size, stored_size = optimize_image(
+                    file_path,
+                    jpeg_quality=current_app.config['IMAGE_JPEG_QUALITY'],
+                    png_compress_level=current_app.config['IMAGE_PNG_COMPRESS_LEVEL'],
+                    keep_icc_profile=current_app.config['IMAGE_KEEP_ICC_PROFILE'],
+                    reencode_jpeg=current_app.config['IMAGE_JPEG_REENCODE']
+                )
+            except Exception as e:
+                print(f"Error optimizing image: {e}")
+                stored_size = os.path.getsize(file_path)
+        else:
+            # PIL is imported on first use to keep it out of the cold-start path
+            from PIL import Image as PILImage
+        
+            # Create thumbnail (optional)
+            try:
+                with PILImage.open(file_path) as img:
+                    # Resize image if it's too large (optional)
+                    max_size = (1920, 1080)
+                    if img.width > max_size[0] or img.height > max_size[1]:
+                        img.thumbnail(max_size, PILImage.LANCZOS)
+                        img.save(file_path)
+            except Exception as e:
+                print(f"Error processing image: {e}")
+                # Continue even if thumbnail creation fails
+            stored_size = os.path.getsize(file_path)
+    
+    # Save the image metadata
+    image = Image(
+        title=title,
+        description=description,
+        filename=unique_filename,
+        user_id=user_id,
+        path=file_path,
+        category=category,
+        price=price,
+        original_size=original_size,
+        stored_size=stored_size
+    )
+    image.save()
+    
+    # Generate URLs for the frontend
+    host_url = request.host_url.rstrip('/')
+    image_url = f"{host_url}/api/uploads/{image.id}"
+    thumbnail_url = f"{host_url}/api/uploads/{image.id}/thumbnail"
+    
+    return jsonify({
+        'message': 'Image uploaded successfully',
+        'image': {
+            'id': image.id,
+            'title': image.title,
+            'description': image.description,
+            'url': image_url,
+            'thumbnail_url': thumbnail_url,
+            'category': image.category,
+            'filename': image.filename,
+            'original_size': image.original_size,
+            'stored_size': image.stored_size,
+            'created_at': image.created_at
+        }
+    }), 201
+
 @uploads_bp.route('', methods=['GET'])
 def get_images():
-    """Get all uploaded images or filter by category or user_id"""
+    """Get all uploaded images or filter by category, user_id or search query"""
     category = request.args.get('category')
     user_id = request.args.get('user_id')
+    query = request.args.get('q', '').strip()
     
-    if category and category != 'all':
-        images = Image.get_by_category(category)
+    # Normalize the filters so equivalent requests share a cache entry
+    if category and category.lower() != 'all':
+        filters = ('category', category.lower())
     elif user_id:
-        # Get images uploaded by a specific user
-        images = Image.get_by_user_id(user_id)
+        filters = ('user_id', user_id)
+    elif query:
+        filters = ('q', query.lower())
     else:
-        images = Image.get_all_images()
+        filters = ('all', None)
     
     # Get host URL for full image URLs
     host_url = request.host_url.rstrip('/')
     
-    # Transform to response format
-    result = []
-    
-    for image in images:
-        result.append({
-            'id': image.id,
-            'title': image.title,
-            'description': image.description,
-            'url': f"{host_url}/api/uploads/{image.id}",
-            'thumbnail_url': f"{host_url}/api/uploads/{image.id}/thumbnail",
-            'user_id': image.user_id,
-            'category': image.category,
-            'price': image.price,
-            'rating': image.rating,
-            'filename': image.filename,
-            'created_at': image.created_at
+    cache = current_app.extensions.get('response_cache')
+    cache_key = (filters, host_url, Image.get_catalog_version())
+    cached = cache.get(cache_key) if cache else None
+    
+    if cached is None:
+        if filters[0] == 'category':
+            images = Image.get_by_category(category)
+        elif filters[0] == 'user_id':
+            # Get images uploaded by a specific user
+            images = Image.get_by_user_id(user_id)
+        elif filters[0] == 'q':
+            images = Image.search(query)
+        else:
+            images = Image.get_all_images()
+        
+        # Transform to response format
+        result = []
+        
+        for image in images:
+            result.append({
+                'id': image.id,
+                'title': image.title,
+                'description': image.description,
+                'url': f"{host_url}/api/uploads/{image.id}",
+                'thumbnail_url': f"{host_url}/api/uploads/{image.id}/thumbnail",
+                'user_id': image.user_id,
+                'category': image.category,
+                'price': image.price,
+                'rating': image.rating,
+                'filename': image.filename,
+                'created_at': image.created_at
+            })
+        
+        response = jsonify({
+            'total': len(result),
+            'images': result
         })
+        if not cache:
+            return response
+        
+        cached = cache.put(cache_key, response.get_data(), response.mimetype)
+        cache_status = 'MISS'
+    else:
+        cache_status = 'HIT'
     
-    return jsonify({
-        'total': len(result),
-        'images': result
-    })
+    # Serve the pre-compressed body to clients that accept gzip
+    if cached.gzipped is not None and request.accept_encodings['gzip'] > 0:
+        response = current_app.response_class(cached.gzipped, mimetype=cached.mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = current_app.response_class(cached.body, mimetype=cached.mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['X-Cache'] = cache_status
+    return response
+
+@uploads_bp.route('/cache', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """Hit/miss counters of the listing response cache (for this worker process)"""
+    cache = current_app.extensions.get('response_cache')
+    if not cache:
+        return jsonify({'enabled': False})
+
+    return jsonify({'enabled': True, **cache.stats()})
 
 @uploads_bp.route('/<image_id>', methods=['GET'])
 def get_image_file(image_id):
@@ -1,6 +1,5 @@
 import os
 import uuid
-from PIL import Image
 from flask import current_app
 from typing import Tuple, Optional
 
@@ -28,7 +27,8 @@ def create_thumbnail(image_path: str, size: Tuple[int, int] = (300, 300)) -> Opt
         upload_folder = current_app.config['UPLOAD_FOLDER']
         thumbnail_path = os.path.join(upload_folder, thumbnail_name)
         
-        # Create thumbnail
+        # Create thumbnail (PIL is imported lazily to keep cold starts fast)
+        from PIL import Image
         with Image.open(image_path) as img:
             img.thumbnail(size, Image.LANCZOS)
             img.save(thumbnail_path)
@@ -83,8 +83,283 @@ def is_valid_image(file_path: str) -> bool:
         True if it's a valid image, False otherwise
     """
     try:
+        from PIL import Image
         with Image.open(file_path) as img:
             img.verify()
         return True
     except Exception:
-        return False 
\ No newline at end of file
+        return False 
+
+def optimize_image(file_path: str, max_size: Tuple[int, int] = (1920, 1080),
+                   jpeg_quality: int = 90, png_compress_level: int = 9,
+                   keep_icc_profile: bool = True, reencode_jpeg: bool = False) -> Tuple[int, int]:
+    """
+    Shrink a stored image in place without changing its pixels
+    
+    Images that need rotating (EXIF orientation) or are larger than max_size
+    are decoded, transformed and re-encoded once. All other images keep
+    their pixel data: PNGs are recompressed losslessly (with a palette when
+    that is exact), and EXIF, XMP and comment metadata are cut out of
+    JPEG/MPO, WebP and GIF files at the container level. The progressive,
+    optimized-Huffman JPEG re-encode is lossy and only done if reencode_jpeg
+    is set. Animated GIF, WebP and PNG files are never re-encoded, since
+    saving would keep only the current frame; they only have metadata cut.
+    
+    Args:
+        file_path: Path to the stored image
+        max_size: Maximum (width, height); larger images are downscaled
+        jpeg_quality: Quality used when JPEG pixels had to change
+        png_compress_level: zlib level for PNG output (0-9)
+        keep_icc_profile: Whether to keep the embedded color profile
+        reencode_jpeg: Re-encode untouched JPEGs as progressive/optimized
+        
+    Returns:
+        File size in bytes before and after optimization
+    """
+    from PIL import Image, ImageOps
+    
+    original_size = os.path.getsize(file_path)
+    
+    with Image.open(file_path) as img:
+        img_format = img.format
+        icc_profile = img.info.get('icc_profile') if keep_icc_profile else None
+        rotate = img.getexif().get(0x0112, 1) != 1  # 0x0112 is the Orientation tag
+        # MPO files count as animated, but only their primary image is kept anyway
+        animated = getattr(img, 'is_animated', False) and img_format != 'MPO'
+        
+        if not animated and (rotate or img.width > max_size[0] or img.height > max_size[1]):
+            # The pixels change anyway, so bake in the orientation and re-encode once
+            transformed = ImageOps.exif_transpose(img) if rotate else img.copy()
+            transformed.thumbnail(max_size, Image.LANCZOS)
+            save_format = 'JPEG' if img_format == 'MPO' else img_format
+            save_kwargs = _encoder_options(save_format, icc_profile, jpeg_quality, png_compress_level)
+            if save_format == 'PNG':
+                transformed = _to_palette_if_lossless(transformed)
+            _save_atomically(transformed, file_path, save_format, save_kwargs, only_if_smaller=False)
+            return original_size, os.path.getsize(file_path)
+        
+        if img_format == 'PNG' and not animated:
+            # PNG compression is lossless; the encoder writes no metadata chunks
+            save_kwargs = _encoder_options('PNG', icc_profile, jpeg_quality, png_compress_level)
+            _save_atomically(_to_palette_if_lossless(img), file_path, 'PNG', save_kwargs)
+            return original_size, os.path.getsize(file_path)
+        
+        if img_format == 'JPEG' and reencode_jpeg:
+            # Reuse the original quantization tables to keep the loss minimal
+            save_kwargs = _encoder_options('JPEG', icc_profile, 'keep', png_compress_level)
+            save_kwargs['subsampling'] = 'keep'
+            _save_atomically(img, file_path, 'JPEG', save_kwargs)
+    
+    stripper = _METADATA_STRIPPERS.get(img_format)
+    if stripper:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        stripped = stripper(data, keep_icc_profile)
+        if stripped is not None and len(stripped) < len(data):
+            temp_path = f"{file_path}.optimizing"
+            with open(temp_path, 'wb') as f:
+                f.write(stripped)
+            os.replace(temp_path, file_path)
+    
+    return original_size, os.path.getsize(file_path)
+
+def _encoder_options(img_format: str, icc_profile: Optional[bytes], jpeg_quality, png_compress_level: int) -> dict:
+    """PIL save() options for an optimized re-encode"""
+    if img_format == 'JPEG':
+        options = {'optimize': True, 'progressive': True, 'quality': jpeg_quality}
+    elif img_format == 'PNG':
+        options = {'optimize': True, 'compress_level': png_compress_level}
+    else:
+        options = {}
+    
+    if icc_profile and img_format in ('JPEG', 'PNG', 'WEBP'):
+        options['icc_profile'] = icc_profile
+    return options
+
+def _save_atomically(img, file_path: str, img_format: str, save_kwargs: dict, only_if_smaller: bool = True) -> None:
+    """Save img over file_path through a temp file (optionally only if it's smaller)"""
+    temp_path = f"{file_path}.optimizing"
+    try:
+        img.save(temp_path, format=img_format, **save_kwargs)
+        if not only_if_smaller or os.path.getsize(temp_path) < os.path.getsize(file_path):
+            os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _to_palette_if_lossless(img):
+    """Convert an RGB image with at most 256 colors to palette mode"""
+    if img.mode != 'RGB' or img.getcolors(256) is None:
+        return img
+    
+    from PIL import Image
+    
+    palette_img = img.convert('P', palette=Image.ADAPTIVE, colors=256)
+    if palette_img.convert('RGB').tobytes() != img.tobytes():
+        return img
+    return palette_img
+
+def _strip_jpeg_metadata(data: bytes, keep_icc_profile: bool) -> Optional[bytes]:
+    """
+    Drop EXIF/XMP/comment segments from a JPEG (or MPO) without decoding it
+    
+    Only the primary image is kept, so the extra images of an MPO file and
+    any trailing data are dropped as well. Returns None if the file can't
+    be parsed.
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    
+    out = [data[:2]]
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # Fill byte
+            continue
+        if marker == 0xD9:
+            out.append(data[pos:pos + 2])
+            return b''.join(out)
+        
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        segment = data[pos:pos + 2 + length]
+        
+        if marker == 0xDA:
+            # Start of scan: copy everything up to and including the first EOI
+            end = _find_jpeg_eoi(data, pos + 2 + length)
+            if end is None:
+                return None
+            out.append(data[pos:end])
+            return b''.join(out)
+        
+        if _keep_jpeg_segment(marker, segment[4:], keep_icc_profile):
+            out.append(segment)
+        pos += 2 + length
+    
+    return None
+
+def _keep_jpeg_segment(marker: int, payload: bytes, keep_icc_profile: bool) -> bool:
+    """Whether a JPEG header segment is needed to display the image"""
+    if marker == 0xFE:  # COM
+        return False
+    if 0xE0 <= marker <= 0xEF:  # APP0-APP15
+        if marker == 0xE0:
+            return payload.startswith(b'JFIF\x00')
+        if marker == 0xE2 and payload.startswith(b'ICC_PROFILE\x00'):
+            return keep_icc_profile
+        # Adobe APP14 tells decoders which color transform was used
+        return marker == 0xEE and payload.startswith(b'Adobe')
+    return True
+
+def _find_jpeg_eoi(data: bytes, pos: int) -> Optional[int]:
+    """Offset just past the EOI marker that ends the entropy-coded data"""
+    while True:
+        pos = data.find(b'\xff', pos)
+        if pos < 0 or pos + 1 >= len(data):
+            return None
+        marker = data[pos + 1]
+        if marker == 0x00 or 0xD0 <= marker <= 0xD7:
+            pos += 2  # Stuffed byte or restart marker
+        elif marker == 0xFF:
+            pos += 1
+        elif marker == 0xD9:
+            return pos + 2
+        else:
+            # Tables or another scan header between progressive scans
+            pos += 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+
+def _strip_webp_metadata(data: bytes, keep_icc_profile: bool) -> Optional[bytes]:
+    """Drop EXIF and XMP chunks from a WebP file without decoding it"""
+    if data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        return None
+    
+    drop = {b'EXIF', b'XMP '} if keep_icc_profile else {b'EXIF', b'XMP ', b'ICCP'}
+    chunks = []
+    pos = 12
+    while pos + 8 <= len(data):
+        fourcc = data[pos:pos + 4]
+        size = int.from_bytes(data[pos + 4:pos + 8], 'little')
+        end = pos + 8 + size + (size & 1)  # Chunks are padded to an even size
+        if end > len(data):
+            return None
+        chunks.append((fourcc, data[pos:end]))
+        pos = end
+    
+    kept = [(fourcc, chunk) for fourcc, chunk in chunks if fourcc not in drop]
+    if len(kept) == len(chunks):
+        return None
+    
+    body = []
+    for fourcc, chunk in kept:
+        if fourcc == b'VP8X':
+            # Clear the ICC (0x20), EXIF (0x08) and XMP (0x04) feature flags we dropped
+            flags = chunk[8] & ~0x0C
+            if not keep_icc_profile:
+                flags &= ~0x20
+            chunk = chunk[:8] + bytes([flags]) + chunk[9:]
+        body.append(chunk)
+    body = b''.join(body)
+    return b'RIFF' + (len(body) + 4).to_bytes(4, 'little') + b'WEBP' + body
+
+def _strip_gif_metadata(data: bytes, keep_icc_profile: bool) -> Optional[bytes]:
+    """Drop comment and XMP extension blocks from a GIF without decoding it"""
+    if data[:6] not in (b'GIF87a', b'GIF89a'):
+        return None
+    
+    keep_applications = {b'NETSCAPE2.0', b'ANIMEXTS1.0'}
+    if keep_icc_profile:
+        keep_applications.add(b'ICCRGBG1012')
+    
+    try:
+        pos = 13
+        if data[10] & 0x80:  # Global color table
+            pos += 3 * 2 ** ((data[10] & 0x07) + 1)
+        out = [data[:pos]]
+        changed = False
+        
+        while True:
+            block = data[pos]
+            if block == 0x3B:  # Trailer
+                out.append(data[pos:pos + 1])
+                break
+            start = pos
+            if block == 0x2C:  # Image descriptor
+                flags = data[pos + 9]
+                pos += 10
+                if flags & 0x80:  # Local color table
+                    pos += 3 * 2 ** ((flags & 0x07) + 1)
+                pos = _skip_gif_sub_blocks(data, pos + 1)  # Skip the LZW code size byte
+                out.append(data[start:pos])
+            elif block == 0x21:  # Extension
+                label = data[pos + 1]
+                pos = _skip_gif_sub_blocks(data, pos + 2)
+                drop = label == 0xFE or (label == 0xFF and data[start + 3:start + 14] not in keep_applications)
+                if drop:
+                    changed = True
+                else:
+                    out.append(data[start:pos])
+            else:
+                return None
+    except IndexError:
+        return None
+    
+    return b''.join(out) if changed else None
+
+def _skip_gif_sub_blocks(data: bytes, pos: int) -> int:
+    """Offset just past a chain of GIF data sub-blocks"""
+    while True:
+        size = data[pos]
+        pos += 1
+        if size == 0:
+            return pos
+        pos += size
+
+# Container-level metadata strippers by PIL format name
+_METADATA_STRIPPERS = {
+    'JPEG': _strip_jpeg_metadata,
+    'MPO': _strip_jpeg_metadata,
+    'WEBP': _strip_webp_metadata,
+    'GIF': _strip_gif_metadata
+}
@@ -0,0 +1,147 @@
+import hashlib
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+# Request header carrying a signed profiling token ("<expires>.<hex hmac>")
+PROFILE_HEADER = 'X-Profile-Token'
+
+class StackSampler:
+    """Sampling profiler that periodically records the stack of one thread"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self) -> None:
+        """Start sampling in a background thread"""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format (one "frame;frame;frame count" per line)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def make_profile_token(secret: str, ttl: int = 300) -> str:
+    """
+    Create a token that enables profiling for requests sending it
+
+    Args:
+        secret: The app's PROFILE_SECRET
+        ttl: Number of seconds the token stays valid
+
+    Returns:
+        Token to send in the X-Profile-Token header
+    """
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    """Check the signature and expiry of a profiling token"""
+    expires, _, signature = token.partition('.')
+    # isdigit() alone accepts characters like "²" that int() rejects
+    if not (expires.isascii() and expires.isdigit()) or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected.encode(), signature.encode('utf-8', 'replace'))
+
+def _prune_profiles(profile_dir: str, max_files: int) -> None:
+    """Delete the oldest profiles so at most max_files remain"""
+    profiles = sorted(
+        os.path.join(profile_dir, name) for name in os.listdir(profile_dir) if name.endswith('.collapsed')
+    )
+    for path in profiles[:max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Another worker already removed it
+
+def init_profiling(app) -> None:
+    """
+    Register request hooks that profile a request when it is sampled or
+    carries a valid signed X-Profile-Token header
+
+    Nothing is registered unless PROFILE_SAMPLE_RATE or PROFILE_SECRET is
+    configured, so there is no per-request cost when profiling is off.
+
+    Args:
+        app: Flask application instance
+    """
+    from flask import g, request
+
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    secret = app.config['PROFILE_SECRET']
+    if not sample_rate and not secret:
+        return
+
+    profile_dir = app.config['PROFILE_FOLDER']
+    os.makedirs(profile_dir, exist_ok=True)
+
+    def should_profile() -> bool:
+        token = request.headers.get(PROFILE_HEADER)
+        if secret and token and verify_profile_token(secret, token):
+            return True
+        return sample_rate > 0 and random.random() < sample_rate
+
+    @app.before_request
+    def start_profiler():
+        if should_profile():
+            g.profiler = StackSampler(threading.get_ident(), app.config['PROFILE_INTERVAL'])
+            g.profiler.start()
+
+    @app.after_request
+    def add_profile_header(response):
+        if getattr(g, 'profiler', None) is not None:
+            g.profile_name = _profile_name(request.method, request.path)
+            response.headers['X-Profile-Id'] = g.profile_name
+        return response
+
+    @app.teardown_request
+    def write_profile(exc: Optional[BaseException] = None):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+
+        profiler.stop()
+        name = g.pop('profile_name', None) or _profile_name(request.method, request.path)
+        try:
+            with open(os.path.join(profile_dir, name), 'w') as f:
+                f.write(profiler.collapsed())
+            _prune_profiles(profile_dir, app.config['PROFILE_MAX_FILES'])
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+def _profile_name(method: str, path: str) -> str:
+    """Sortable, filesystem-safe file name for a request profile"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_') or 'root'
+    return f"{time.time_ns()}_{method}_{slug[:60]}.collapsed"
+
+if __name__ == '__main__':
+    # Print a token for profiling requests: python -m app.utils.profiling [ttl]
+    ttl = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(make_profile_token(os.environ['PROFILE_SECRET'], ttl))
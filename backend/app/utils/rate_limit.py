@@ -0,0 +1,166 @@
+import importlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Tuple
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+
+# Seconds per period name in limits like "10/minute"
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+def parse_limit(limit: str) -> Tuple[int, float]:
+    """
+    Parse a limit of the form "<count>/<period>" (e.g. "10/minute")
+
+    Args:
+        limit: Limit string
+
+    Returns:
+        Bucket capacity and refill rate in tokens per second
+    """
+    count, _, period = limit.partition('/')
+    seconds = PERIODS.get(period.strip().rstrip('s'))
+    if not (count.strip().isascii() and count.strip().isdigit()) or int(count) <= 0 or seconds is None:
+        raise ValueError(f"Invalid rate limit: {limit!r}, expected e.g. '10/minute'")
+    capacity = int(count)
+    return capacity, capacity / seconds
+
+class MemoryRateLimitStore:
+    """
+    In-process token bucket store
+
+    Any object with the same consume() signature can be plugged in through
+    RATE_LIMIT_STORAGE (e.g. one backed by Redis) to share buckets between
+    worker processes.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Take tokens from a bucket
+
+        Args:
+            key: Bucket key (scope and client)
+            capacity: Maximum number of tokens (burst size)
+            rate: Tokens added per second
+            cost: Tokens this request needs
+
+        Returns:
+            Whether the request is allowed, and seconds until it would be
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= cost:
+                allowed, retry_after = True, 0.0
+                tokens -= cost
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Forget the least recently seen clients; they come back with a full bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed, retry_after
+
+def _load_store(app):
+    """Create the rate limit store named by RATE_LIMIT_STORAGE"""
+    storage = app.config['RATE_LIMIT_STORAGE']
+    if storage == 'memory':
+        return MemoryRateLimitStore()
+
+    # "package.module:factory", called with the app
+    module_name, _, factory_name = storage.partition(':')
+    factory = getattr(importlib.import_module(module_name), factory_name)
+    return factory(app)
+
+def init_rate_limiting(app) -> None:
+    """
+    Set up the rate limit store and the image processing concurrency limit
+
+    All RATE_LIMIT_<SCOPE> limits are parsed here, so a bad value fails at
+    startup instead of on every request.
+
+    Args:
+        app: Flask application instance
+    """
+    app.extensions['rate_limits'] = {
+        key[len('RATE_LIMIT_'):].lower(): parse_limit(value)
+        for key, value in app.config.items()
+        if key.startswith('RATE_LIMIT_') and key not in ('RATE_LIMIT_ENABLED', 'RATE_LIMIT_STORAGE')
+    }
+    if app.config['IMAGE_PROCESSING_CONCURRENCY'] < 1:
+        raise ValueError('IMAGE_PROCESSING_CONCURRENCY must be at least 1')
+
+    app.extensions['rate_limit_store'] = _load_store(app)
+    app.extensions['image_processing_slots'] = threading.BoundedSemaphore(
+        app.config['IMAGE_PROCESSING_CONCURRENCY'])
+
+def rate_limit(scope: str, per_identity: bool = False):
+    """
+    Limit requests per client IP (and per JWT identity) with a token bucket
+
+    The limit is read from the RATE_LIMIT_<SCOPE> config value. Requests
+    over the limit get a 429 with a Retry-After header. Clients are told
+    apart by request.remote_addr, which honours X-Forwarded-For when
+    TRUSTED_PROXY_COUNT is set. Use per_identity only below @jwt_required().
+
+    Args:
+        scope: Name of the limit (e.g. 'upload', 'auth')
+        per_identity: Also limit per authenticated user
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            store = current_app.extensions.get('rate_limit_store')
+            if store is not None and current_app.config['RATE_LIMIT_ENABLED']:
+                capacity, rate = current_app.extensions['rate_limits'][scope]
+
+                keys = [f"{scope}:ip:{request.remote_addr}"]
+                if per_identity:
+                    keys.append(f"{scope}:user:{get_jwt_identity()}")
+
+                for key in keys:
+                    allowed, retry_after = store.consume(key, capacity, rate)
+                    if not allowed:
+                        raise TooManyRequests('Rate limit exceeded, please retry later',
+                                              retry_after=math.ceil(retry_after))
+
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def image_processing_slot():
+    """
+    Hold one of the IMAGE_PROCESSING_CONCURRENCY image processing slots
+
+    Waits up to IMAGE_PROCESSING_QUEUE_TIMEOUT seconds for a slot and then
+    sheds the request with a 503 and a Retry-After header.
+    """
+    slots = current_app.extensions.get('image_processing_slots')
+    if slots is None:
+        yield
+        return
+
+    if not slots.acquire(timeout=current_app.config['IMAGE_PROCESSING_QUEUE_TIMEOUT']):
+        raise ServiceUnavailable('Server is busy processing images, please retry later',
+                                 retry_after=current_app.config['IMAGE_PROCESSING_RETRY_AFTER'])
+    try:
+        yield
+    finally:
+        slots.release()
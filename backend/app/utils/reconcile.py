@@ -0,0 +1,294 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.models.image import Image
+from app.models.upload_session import UploadSession
+
+# Name of the folder (inside the upload folder) orphans are moved to
+QUARANTINE_DIRNAME = '.quarantine'
+
+def _batches(items: Iterable, batch_size: int, pause: float) -> Iterator[List]:
+    """Yield items in lists of batch_size, sleeping between batches"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+            if pause:
+                time.sleep(pause)
+    if batch:
+        yield batch
+
+def _discard(path: str, quarantine_folder: Optional[str], dry_run: bool) -> int:
+    """Remove (or quarantine) a file and return its size in bytes"""
+    try:
+        size = os.path.getsize(path)
+        if dry_run:
+            return size
+        if quarantine_folder:
+            os.makedirs(quarantine_folder, exist_ok=True)
+            target = os.path.join(quarantine_folder, os.path.basename(path))
+            if os.path.exists(target):
+                target = f"{target}.{time.time_ns()}"
+            shutil.move(path, target)
+            # Start the retention period now rather than at the file's last write
+            os.utime(target)
+        else:
+            os.remove(path)
+        return size
+    except OSError as e:
+        print(f"Error removing {path}: {e}")
+        return 0
+
+def _load_catalog() -> List[Image]:
+    """Read the image catalog, refusing to continue if it can't be parsed"""
+    try:
+        return Image.get_all_images(strict=True)
+    except json.JSONDecodeError as e:
+        # Treating an unreadable catalog as empty would orphan every file
+        raise RuntimeError(f"Image catalog could not be parsed, aborting reconciliation: {e}")
+
+def _referenced_names(images: Iterable[Image]) -> set:
+    """File names in the upload folder that image records point at"""
+    referenced = {image.filename for image in images if image.filename}
+    referenced.update(os.path.basename(image.path.replace('\\', '/')) for image in images if image.path)
+    return referenced
+
+def reconcile(upload_folder: str, staging_folder: str, batch_size: int = 500,
+              batch_pause: float = 0.0, grace_period: int = 3600, session_ttl: int = 86400,
+              quarantine: bool = False, quarantine_retention: int = 7 * 86400,
+              dry_run: bool = False) -> Dict[str, int]:
+    """
+    Bring the upload folder and the image catalog back in sync
+
+    - Files in the upload folder that no image record refers to are removed
+      (or moved to uploads/.quarantine) once they are older than grace_period,
+      so uploads that are still being processed are left alone. The catalog
+      is re-read before each batch of removals.
+    - Quarantined files are deleted after quarantine_retention seconds.
+    - Image records whose file is gone are dropped; records whose stored path
+      is stale but whose file is still in the upload folder are repointed.
+    - Upload sessions idle for longer than session_ttl are discarded along
+      with their staging files, as are staging files without a session.
+    - The catalog is rewritten once, without duplicate records.
+
+    Directory entries and records are processed in batches of batch_size,
+    sleeping batch_pause seconds in between to limit the I/O burst. The run
+    is aborted with RuntimeError if the catalog can't be parsed.
+
+    Args:
+        upload_folder: Folder holding the stored image files
+        staging_folder: Folder holding partial resumable uploads
+        batch_size: Number of entries handled per batch
+        batch_pause: Seconds to sleep between batches
+        grace_period: Minimum age in seconds before an unreferenced file is removed
+        session_ttl: Seconds of inactivity after which an upload session expires
+        quarantine: Move orphans to the quarantine folder instead of deleting them
+        quarantine_retention: Seconds quarantined files are kept before deletion
+        dry_run: Only report what would be done
+
+    Returns:
+        Counters describing the work done; reclaimed_bytes only counts data
+        that was actually deleted, quarantined_bytes what was moved aside
+    """
+    report = {
+        'orphan_files': 0,
+        'dangling_records': 0,
+        'repaired_records': 0,
+        'duplicate_records': 0,
+        'expired_sessions': 0,
+        'orphan_staging_files': 0,
+        'quarantined_files': 0,
+        'quarantined_bytes': 0,
+        'purged_quarantine_files': 0,
+        'reclaimed_bytes': 0
+    }
+    quarantine_folder = os.path.join(upload_folder, QUARANTINE_DIRNAME) if quarantine else None
+
+    # Catalog: drop duplicates, repair stale paths and drop records without a file
+    images = _load_catalog()
+    unique = {}
+    for image in images:
+        unique[image.id] = image
+    report['duplicate_records'] = len(images) - len(unique)
+
+    kept = []
+    dangling_ids = set()
+    repaired_paths = {}
+    for batch in _batches(unique.values(), batch_size, batch_pause):
+        for image in batch:
+            if image.path and os.path.exists(image.path):
+                kept.append(image)
+                continue
+
+            local_path = os.path.join(upload_folder, image.filename) if image.filename else None
+            if local_path and os.path.exists(local_path):
+                image.path = local_path
+                repaired_paths[image.id] = local_path
+                kept.append(image)
+            else:
+                dangling_ids.add(image.id)
+
+    report['dangling_records'] = len(dangling_ids)
+    report['repaired_records'] = len(repaired_paths)
+
+    if (dangling_ids or repaired_paths or report['duplicate_records']) and not dry_run:
+        # Re-read the catalog under the lock uploads take, so records they
+        # write while we were checking are neither lost nor overwritten
+        with Image.catalog_lock():
+            compacted = {}
+            for image in _load_catalog():
+                if image.id in dangling_ids:
+                    continue
+                if image.id in repaired_paths:
+                    image.path = repaired_paths[image.id]
+                compacted[image.id] = image
+            catalog_size = os.path.getsize(Image.IMAGES_FILE)
+            Image.save_all_images(list(compacted.values()))
+        report['reclaimed_bytes'] += max(catalog_size - os.path.getsize(Image.IMAGES_FILE), 0)
+
+    # Blobs: remove files no record refers to
+    referenced = _referenced_names(kept)
+    cutoff = time.time() - grace_period
+
+    with os.scandir(upload_folder) as entries:
+        for batch in _batches(entries, batch_size, batch_pause):
+            candidates = [
+                entry for entry in batch
+                # Skip the staging/quarantine folders and dotfiles like .gitkeep
+                if not entry.name.startswith('.') and entry.is_file(follow_symlinks=False)
+                and entry.name not in referenced and entry.stat().st_mtime <= cutoff
+            ]
+            if not candidates:
+                continue
+
+            # Records may have been added since the snapshot was taken
+            referenced = _referenced_names(_load_catalog())
+            for entry in candidates:
+                try:
+                    recent = os.stat(entry.path).st_mtime > cutoff
+                except OSError:
+                    continue  # Already gone
+                if entry.name in referenced or recent:
+                    continue
+                report['orphan_files'] += 1
+                size = _discard(entry.path, quarantine_folder, dry_run)
+                if quarantine_folder:
+                    report['quarantined_files'] += 1
+                    report['quarantined_bytes'] += size
+                else:
+                    report['reclaimed_bytes'] += size
+
+    # Quarantine: delete files that have been kept for the retention period
+    quarantine_dir = os.path.join(upload_folder, QUARANTINE_DIRNAME)
+    if os.path.isdir(quarantine_dir):
+        purge_before = time.time() - quarantine_retention
+        with os.scandir(quarantine_dir) as entries:
+            for batch in _batches(entries, batch_size, batch_pause):
+                for entry in batch:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime <= purge_before:
+                        report['purged_quarantine_files'] += 1
+                        report['reclaimed_bytes'] += _discard(entry.path, None, dry_run)
+
+    # Resumable uploads: expire idle sessions and remove unowned staging files
+    expires_before = time.time() - session_ttl
+    live_sessions = []
+    for session in UploadSession.get_all_sessions():
+        if session.last_activity < expires_before:
+            report['expired_sessions'] += 1
+            if session.staging_path and os.path.exists(session.staging_path):
+                report['reclaimed_bytes'] += _discard(session.staging_path, None, dry_run)
+            if not dry_run:
+                session.delete(remove_staging_file=False)
+        else:
+            live_sessions.append(session)
+
+    if os.path.isdir(staging_folder):
+        live_staging = {os.path.basename(session.staging_path) for session in live_sessions if session.staging_path}
+        with os.scandir(staging_folder) as entries:
+            for batch in _batches(entries, batch_size, batch_pause):
+                for entry in batch:
+                    if not entry.is_file(follow_symlinks=False) or entry.name in live_staging:
+                        continue
+                    if entry.stat().st_mtime > cutoff:
+                        continue
+                    report['orphan_staging_files'] += 1
+                    report['reclaimed_bytes'] += _discard(entry.path, None, dry_run)
+
+    return report
+
+def reconcile_app(app, **kwargs) -> Dict[str, int]:
+    """Run reconcile with the folders and settings of a Flask app"""
+    options = {
+        'batch_size': app.config['RECONCILE_BATCH_SIZE'],
+        'batch_pause': app.config['RECONCILE_BATCH_PAUSE'],
+        'grace_period': app.config['RECONCILE_GRACE_PERIOD'],
+        'session_ttl': app.config['UPLOAD_SESSION_TTL'],
+        'quarantine': app.config['RECONCILE_QUARANTINE'],
+        'quarantine_retention': app.config['RECONCILE_QUARANTINE_RETENTION']
+    }
+    options.update(kwargs)
+    return reconcile(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_STAGING_FOLDER'], **options)
+
+def start_reconciler(app) -> threading.Thread:
+    """
+    Run reconcile_app every RECONCILE_INTERVAL seconds in a background thread
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        The started daemon thread
+    """
+    interval = app.config['RECONCILE_INTERVAL']
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                report = reconcile_app(app)
+                print(f"Storage reconciliation: {report}")
+            except Exception as e:
+                print(f"Error reconciling storage: {e}")
+
+    thread = threading.Thread(target=run, name='reconciler', daemon=True)
+    thread.start()
+    return thread
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m app.utils.reconcile"""
+    parser = argparse.ArgumentParser(description='Remove orphaned uploads and dangling image records')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would be removed')
+    parser.add_argument('--quarantine', action='store_true', help='move orphaned files to uploads/.quarantine')
+    parser.add_argument('--batch-size', type=int, help='entries handled per batch')
+    parser.add_argument('--grace-period', type=int, help='minimum age in seconds of removed files')
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    app = create_app()
+
+    options = {'dry_run': args.dry_run}
+    if args.quarantine:
+        options['quarantine'] = True
+    if args.batch_size:
+        options['batch_size'] = args.batch_size
+    if args.grace_period is not None:
+        options['grace_period'] = args.grace_period
+
+    try:
+        report = reconcile_app(app, **options)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+class CachedResponse:
+    """A fully rendered response body, plus a gzip copy for large bodies"""
+
+    def __init__(self, body: bytes, mimetype: str, gzipped: Optional[bytes] = None):
+        self.body = body
+        self.mimetype = mimetype
+        self.gzipped = gzipped
+
+class ResponseCache:
+    """Bounded, thread-safe LRU cache of rendered response bodies"""
+
+    def __init__(self, max_entries: int = 256, compress_min_bytes: int = 1024):
+        self.max_entries = max_entries
+        self.compress_min_bytes = compress_min_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """Look up a response and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, mimetype: str = 'application/json') -> CachedResponse:
+        """Store a rendered body, evicting the least recently used entries"""
+        gzipped = None
+        if self.compress_min_bytes and len(body) >= self.compress_min_bytes:
+            gzipped = gzip.compress(body, compresslevel=6)
+
+        entry = CachedResponse(body, mimetype, gzipped)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
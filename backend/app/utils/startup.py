@@ -0,0 +1,156 @@
+import os
+import re
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Modules that must not be imported while the app starts up; they are loaded
+# on first use by the request handlers instead
+DEFERRED_MODULES = ('PIL', 'dotenv')
+
+# Default cumulative import time budget for `import run` (in milliseconds)
+DEFAULT_IMPORT_BUDGET_MS = 800
+
+# Matches a line of `python -X importtime` output:
+# "import time:       123 |        456 |   package.module"
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def find_env_file(start_dir: str = BACKEND_DIR) -> Optional[str]:
+    """
+    Find a .env file the way python-dotenv's find_dotenv() does, without
+    importing python-dotenv
+
+    Checks start_dir and then each parent directory up to the filesystem root.
+
+    Args:
+        start_dir: Directory to start searching from
+
+    Returns:
+        Path to the nearest .env file or None
+    """
+    path = os.path.abspath(start_dir)
+    while True:
+        candidate = os.path.join(path, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+def warm_up(app) -> None:
+    """
+    Preload the things the first request would otherwise pay for
+
+    Imports PIL and registers its format plugins, and reads the image and
+    user catalogs once so the JSON files are in the page cache.
+
+    Args:
+        app: Flask application instance
+    """
+    from app.models.image import Image
+    from app.models.user import User
+
+    try:
+        from PIL import Image as PILImage
+        PILImage.init()
+
+        Image.get_all_images()
+        User.get_all_users()
+    except Exception as e:
+        print(f"Error warming up application: {e}")
+
+def start_warm_up(app) -> threading.Thread:
+    """
+    Run warm_up in a background thread so it doesn't delay the first response
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        The started daemon thread
+    """
+    thread = threading.Thread(target=warm_up, args=(app,), name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def measure_import_time(module: str = 'run') -> Tuple[int, Dict[str, int]]:
+    """
+    Measure the cold import time of a module using `python -X importtime`
+
+    Args:
+        module: Module to import, relative to the backend directory
+
+    Returns:
+        Total cumulative import time in microseconds, and the cumulative
+        time of every module that was imported
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR,
+        env={**os.environ, 'WARMUP_ON_START': '0'},
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    total = 0
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules[name] = cumulative
+        # Top-level imports have a single space of indentation
+        if len(indent) == 1:
+            total += cumulative
+
+    return total, modules
+
+def check_import_budget(budget_ms: int = DEFAULT_IMPORT_BUDGET_MS, module: str = 'run') -> List[str]:
+    """
+    Check the startup import time against a budget
+
+    Args:
+        budget_ms: Maximum allowed cumulative import time in milliseconds
+        module: Module to import, relative to the backend directory
+
+    Returns:
+        List of problems found (empty if the budget is met)
+    """
+    total, modules = measure_import_time(module)
+    problems = []
+
+    if total > budget_ms * 1000:
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]
+        details = '\n'.join(f"  {cumulative / 1000:8.1f} ms  {name}" for name, cumulative in slowest)
+        problems.append(f"Importing {module} took {total / 1000:.1f} ms (budget {budget_ms} ms):\n{details}")
+
+    for name in DEFERRED_MODULES:
+        # python-dotenv is legitimately needed when there is a .env file to load
+        if name == 'dotenv' and find_env_file():
+            continue
+        if name in modules:
+            problems.append(f"{name} is imported at startup but should be loaded on first use")
+
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m app.utils.startup [budget_ms]"""
+    argv = sys.argv[1:] if argv is None else argv
+    budget_ms = int(argv[0]) if argv else int(os.environ.get('IMPORT_BUDGET_MS', DEFAULT_IMPORT_BUDGET_MS))
+
+    problems = check_import_budget(budget_ms)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if not problems:
+        print(f"Startup imports are within the {budget_ms} ms budget")
+    return 1 if problems else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,15 @@
-from app import create_app
 import os
-from dotenv import load_dotenv
+from app.utils.startup import find_env_file
+
+# Load environment variables from the nearest .env file (searching parent
+# directories like load_dotenv() does); python-dotenv is only imported when
+# there is something to load, to keep cold starts fast
+env_file = find_env_file()
+if env_file:
+    from dotenv import load_dotenv
+    load_dotenv(env_file)
 
-# Load environment variables from .env file if it exists
-load_dotenv()
+from app import create_app
 
 # Create the Flask application
 app = create_app()
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+from PIL import Image, ImageSequence, features
+
+from app.utils.helpers import optimize_image
+
+def _noise(size=(64, 48)):
+    """An RGB image with enough detail that re-encoding would change it"""
+    return Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+
+def _exif(orientation=None):
+    """EXIF block with a camera make and (optionally) an orientation"""
+    exif = Image.Exif()
+    exif[0x010F] = 'Test camera'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    return exif
+
+def _frames(path):
+    """Decoded frames of an image file"""
+    with Image.open(path) as img:
+        return [frame.convert('RGBA').tobytes() for frame in ImageSequence.Iterator(img)]
+
+@pytest.mark.parametrize('progressive', [False, True])
+def test_jpeg_metadata_is_stripped_losslessly(tmp_path, progressive):
+    """EXIF and comments are removed from JPEGs without touching the pixels"""
+    path = str(tmp_path / 'photo.jpg')
+    _noise().save(path, 'JPEG', quality=95, progressive=progressive,
+                  exif=_exif(), comment=b'a comment')
+    pixels = _frames(path)
+
+    original_size, stored_size = optimize_image(path)
+
+    assert stored_size < original_size
+    assert _frames(path) == pixels
+    with Image.open(path) as img:
+        assert img.format == 'JPEG'
+        assert 'exif' not in img.info
+        assert 'comment' not in img.info
+
+def test_jpeg_orientation_is_applied(tmp_path):
+    """Images with an EXIF orientation are rotated and lose the tag"""
+    path = str(tmp_path / 'rotated.jpg')
+    _noise((64, 48)).save(path, 'JPEG', exif=_exif(orientation=6))
+
+    optimize_image(path)
+
+    with Image.open(path) as img:
+        assert img.size == (48, 64)
+        assert img.getexif().get(0x0112, 1) == 1
+
+@pytest.mark.skipif(not features.check('webp'), reason='Pillow was built without WebP support')
+def test_webp_metadata_is_stripped(tmp_path):
+    """EXIF is cut out of animated WebPs, keeping every frame and fixing the VP8X flags"""
+    path = str(tmp_path / 'anim.webp')
+    frames = [_noise() for _ in range(3)]
+    frames[0].save(path, 'WEBP', save_all=True, append_images=frames[1:], lossless=True, exif=_exif())
+    pixels = _frames(path)
+    with open(path, 'rb') as f:
+        assert b'EXIF' in f.read()
+
+    optimize_image(path)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b'EXIF' not in data
+    assert data[12:16] == b'VP8X'
+    assert not data[20] & 0x08  # EXIF flag
+    assert int.from_bytes(data[4:8], 'little') == len(data) - 8
+    assert _frames(path) == pixels
+
+def test_gif_comments_are_stripped(tmp_path):
+    """GIF comments are removed while the looping extension and frames stay"""
+    path = str(tmp_path / 'anim.gif')
+    frames = [Image.new('P', (32, 32), color) for color in (1, 2, 3)]
+    frames[0].save(path, 'GIF', save_all=True, append_images=frames[1:], loop=0,
+                   duration=100, comment=b'a comment')
+    pixels = _frames(path)
+    with open(path, 'rb') as f:
+        assert b'a comment' in f.read()
+
+    optimize_image(path)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b'NETSCAPE2.0' in data
+    assert b'a comment' not in data
+    assert _frames(path) == pixels
+
+def test_animated_png_keeps_its_frames(tmp_path):
+    """APNGs are not flattened to their first frame"""
+    path = str(tmp_path / 'anim.png')
+    frames = [_noise() for _ in range(5)]
+    frames[0].save(path, 'PNG', save_all=True, append_images=frames[1:], duration=100)
+    pixels = _frames(path)
+
+    optimize_image(path)
+
+    assert _frames(path) == pixels
+
+def test_oversized_animation_is_not_flattened(tmp_path):
+    """Animations larger than max_size are left at their size rather than losing frames"""
+    path = str(tmp_path / 'large.gif')
+    frames = [Image.new('P', (64, 64), color) for color in (1, 2)]
+    frames[0].save(path, 'GIF', save_all=True, append_images=frames[1:], loop=0)
+
+    optimize_image(path, max_size=(32, 32))
+
+    with Image.open(path) as img:
+        assert img.n_frames == 2
+        assert img.size == (64, 64)
+
+def test_png_is_recompressed_losslessly(tmp_path):
+    """Still PNGs are recompressed without changing their pixels"""
+    path = str(tmp_path / 'flat.png')
+    Image.new('RGB', (200, 200), (10, 20, 30)).save(path, 'PNG', compress_level=0)
+    pixels = _frames(path)
+
+    original_size, stored_size = optimize_image(path)
+
+    assert stored_size < original_size
+    assert _frames(path) == pixels
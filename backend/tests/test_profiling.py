@@ -0,0 +1,16 @@
+from app.utils.profiling import make_profile_token, verify_profile_token
+
+def test_valid_token():
+    """A freshly made token verifies with the same secret only"""
+    token = make_profile_token('secret')
+    assert verify_profile_token('secret', token)
+    assert not verify_profile_token('other', token)
+
+def test_expired_token():
+    """Tokens past their expiry are rejected"""
+    assert not verify_profile_token('secret', make_profile_token('secret', ttl=-10))
+
+def test_malformed_tokens():
+    """Malformed tokens are rejected instead of raising"""
+    for token in ['', '.', 'abc', '1²3.x', '9999999999.ß', '9999999999.\udcff']:
+        assert not verify_profile_token('secret', token)
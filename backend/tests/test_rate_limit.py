@@ -0,0 +1,27 @@
+import pytest
+
+from app.utils.rate_limit import MemoryRateLimitStore, parse_limit
+
+def test_parse_limit():
+    """Limits are parsed into (capacity, tokens per second)"""
+    assert parse_limit('10/minute') == (10, 10 / 60)
+    assert parse_limit('5/hours') == (5, 5 / 3600)
+
+@pytest.mark.parametrize('limit', ['0/minute', '-1/minute', '10', '10/fortnight', '²/second'])
+def test_parse_limit_rejects_invalid(limit):
+    """Invalid limits raise ValueError instead of failing per request"""
+    with pytest.raises(ValueError):
+        parse_limit(limit)
+
+def test_memory_store_token_bucket():
+    """A bucket allows a burst of `capacity` requests and then asks to wait"""
+    store = MemoryRateLimitStore()
+    capacity, rate = parse_limit('3/minute')
+
+    assert all(store.consume('ip:1', capacity, rate)[0] for _ in range(3))
+    allowed, retry_after = store.consume('ip:1', capacity, rate)
+    assert not allowed
+    assert 0 < retry_after <= 20
+
+    # Other clients have their own bucket
+    assert store.consume('ip:2', capacity, rate)[0]
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from app.models.image import Image
+from app.models.upload_session import UploadSession
+from app.utils.reconcile import QUARANTINE_DIRNAME, reconcile
+
+# Older than the default one hour grace period
+OLD = time.time() - 2 * 3600
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Empty upload/staging folders with the catalogs pointed at tmp_path"""
+    upload_folder = tmp_path / 'uploads'
+    staging_folder = upload_folder / '.staging'
+    staging_folder.mkdir(parents=True)
+    monkeypatch.setattr(Image, 'IMAGES_FILE', str(tmp_path / 'images.json'))
+    monkeypatch.setattr(UploadSession, 'SESSIONS_DIR', str(tmp_path / 'upload_sessions'))
+    return upload_folder, staging_folder
+
+def _write_file(path, mtime=OLD):
+    """Create a small file with the given modification time"""
+    path.write_bytes(b'image data')
+    os.utime(path, (mtime, mtime))
+    return path
+
+def _add_image(filename, path):
+    """Record an image in the catalog"""
+    image = Image(id=filename, filename=filename, path=str(path))
+    image.save()
+    return image
+
+def test_old_orphans_are_removed_and_recent_ones_kept(storage):
+    upload_folder, staging_folder = storage
+    _add_image('kept.jpg', _write_file(upload_folder / 'kept.jpg'))
+    old = _write_file(upload_folder / 'old.jpg')
+    recent = _write_file(upload_folder / 'recent.jpg', mtime=time.time())
+
+    report = reconcile(str(upload_folder), str(staging_folder))
+
+    assert report['orphan_files'] == 1
+    assert report['reclaimed_bytes'] == len(b'image data')
+    assert not old.exists()
+    assert recent.exists()
+    assert (upload_folder / 'kept.jpg').exists()
+
+def test_orphans_can_be_quarantined(storage):
+    upload_folder, staging_folder = storage
+    _write_file(upload_folder / 'old.jpg')
+
+    report = reconcile(str(upload_folder), str(staging_folder), quarantine=True)
+
+    assert report['quarantined_files'] == 1
+    assert report['reclaimed_bytes'] == 0
+    assert not (upload_folder / 'old.jpg').exists()
+    assert (upload_folder / QUARANTINE_DIRNAME / 'old.jpg').exists()
+
+def test_dangling_records_are_dropped(storage):
+    upload_folder, staging_folder = storage
+    _add_image('kept.jpg', _write_file(upload_folder / 'kept.jpg'))
+    _add_image('gone.jpg', upload_folder / 'gone.jpg')
+
+    report = reconcile(str(upload_folder), str(staging_folder))
+
+    assert report['dangling_records'] == 1
+    assert [image.id for image in Image.get_all_images()] == ['kept.jpg']
+
+def test_stale_windows_paths_are_repointed(storage):
+    """Records copied from another machine point at the file in this upload folder"""
+    upload_folder, staging_folder = storage
+    local = _write_file(upload_folder / 'photo_d10e8ace.jpg')
+    _add_image('photo_d10e8ace.jpg', 'C:\\Users\\someone\\backend\\uploads\\photo_d10e8ace.jpg')
+
+    report = reconcile(str(upload_folder), str(staging_folder))
+
+    assert report['repaired_records'] == 1
+    assert report['orphan_files'] == 0
+    assert local.exists()
+    assert Image.get_all_images()[0].path == str(local)
+
+def test_expired_sessions_are_discarded(storage):
+    upload_folder, staging_folder = storage
+    staging_path = _write_file(staging_folder / 'upload.part')
+    session = UploadSession(user_id='user', filename='photo.jpg', total_size=100,
+                            staging_path=str(staging_path), updated_at='2000-01-01T00:00:00')
+    # save() would stamp updated_at with the current time
+    os.makedirs(UploadSession.SESSIONS_DIR)
+    with open(UploadSession._session_file(session.id), 'w') as f:
+        json.dump(session.to_dict(), f)
+
+    report = reconcile(str(upload_folder), str(staging_folder), session_ttl=3600)
+
+    assert report['expired_sessions'] == 1
+    assert not staging_path.exists()
+    assert UploadSession.get_by_id(session.id) is None
+
+def test_dry_run_changes_nothing(storage):
+    upload_folder, staging_folder = storage
+    _add_image('gone.jpg', upload_folder / 'gone.jpg')
+    orphan = _write_file(upload_folder / 'old.jpg')
+    with open(Image.IMAGES_FILE) as f:
+        catalog = f.read()
+
+    report = reconcile(str(upload_folder), str(staging_folder), dry_run=True)
+
+    assert report['orphan_files'] == 1
+    assert report['dangling_records'] == 1
+    assert orphan.exists()
+    with open(Image.IMAGES_FILE) as f:
+        assert f.read() == catalog
+
+def test_corrupt_catalog_aborts(storage):
+    """An unreadable catalog must not make every file look orphaned"""
+    upload_folder, staging_folder = storage
+    photo = _write_file(upload_folder / 'photo.jpg')
+    with open(Image.IMAGES_FILE, 'w') as f:
+        f.write('[{"id": "photo.jpg", "filename": "pho')
+
+    with pytest.raises(RuntimeError):
+        reconcile(str(upload_folder), str(staging_folder))
+
+    assert photo.exists()
+
+def test_catalog_writes_wait_for_the_lock(storage):
+    """Image.save() can't interleave with a read-modify-write holding the catalog lock"""
+    upload_folder, _ = storage
+    image = Image(id='new.jpg', filename='new.jpg', path=str(upload_folder / 'new.jpg'))
+
+    with Image.catalog_lock():
+        writer = threading.Thread(target=image.save)
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()
+        assert not os.path.exists(Image.IMAGES_FILE)
+
+    writer.join()
+    assert [image.id for image in Image.get_all_images()] == ['new.jpg']
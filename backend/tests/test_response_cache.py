@@ -0,0 +1,104 @@
+import gzip
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.models.image import Image
+from app.utils.response_cache import ResponseCache
+
+@pytest.fixture
+def make_client(tmp_path, monkeypatch):
+    """Build a test client for an app with the given environment and an empty catalog"""
+    monkeypatch.setattr(Image, 'IMAGES_FILE', str(tmp_path / 'images.json'))
+
+    def make(**env):
+        for key, value in env.items():
+            monkeypatch.setenv(key, str(value))
+        return create_app().test_client()
+    return make
+
+def _add_image(title, category='other'):
+    """Record an image in the catalog"""
+    image = Image(title=title, filename=f'{title}.jpg', category=category)
+    image.save()
+    return image
+
+def test_repeated_listings_are_served_from_the_cache(make_client):
+    client = make_client()
+    _add_image('first')
+
+    assert client.get('/api/uploads').headers['X-Cache'] == 'MISS'
+    response = client.get('/api/uploads')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.json['total'] == 1
+
+def test_saving_an_image_invalidates_the_cache(make_client):
+    client = make_client()
+    _add_image('first')
+    client.get('/api/uploads')
+
+    _add_image('second')
+
+    response = client.get('/api/uploads')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.json['total'] == 2
+
+def test_equivalent_filters_share_an_entry(make_client):
+    client = make_client()
+    _add_image('tree', category='Nature')
+    _add_image('car', category='vehicles')
+
+    response = client.get('/api/uploads?category=Nature')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [image['title'] for image in response.json['images']] == ['tree']
+
+    response = client.get('/api/uploads?category=nature')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert [image['title'] for image in response.json['images']] == ['tree']
+
+def test_gzip_is_only_sent_when_accepted(make_client):
+    client = make_client(RESPONSE_CACHE_COMPRESS_MIN_BYTES=1)
+    _add_image('first')
+    plain = client.get('/api/uploads')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    compressed = client.get('/api/uploads', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+
+    refused = client.get('/api/uploads', headers={'Accept-Encoding': 'gzip;q=0, deflate'})
+    assert 'Content-Encoding' not in refused.headers
+
+def test_disabled_cache_returns_plain_responses(make_client):
+    client = make_client(RESPONSE_CACHE_SIZE=0)
+    _add_image('first')
+
+    response = client.get('/api/uploads', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'X-Cache' not in response.headers
+    assert 'Content-Encoding' not in response.headers
+    assert response.json['total'] == 1
+
+def test_cache_stats_endpoint(make_client):
+    client = make_client()
+    client.get('/api/uploads')
+    client.get('/api/uploads')
+    with client.application.app_context():
+        token = create_access_token(identity='user')
+
+    response = client.get('/api/uploads/cache', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.json == {'enabled': True, 'hits': 1, 'misses': 1, 'entries': 1, 'max_entries': 256}
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2, compress_min_bytes=0)
+    cache.put('a', b'a')
+    cache.put('b', b'b')
+    cache.get('a')
+    cache.put('c', b'c')
+
+    assert cache.get('b') is None
+    assert cache.get('a').body == b'a'
+    assert cache.stats()['entries'] == 2
@@ -0,0 +1,14 @@
+from app.utils.startup import check_import_budget, find_env_file
+
+def test_import_budget():
+    """Importing the app stays within the cold start budget without loading PIL"""
+    problems = check_import_budget()
+    assert not problems, '\n'.join(problems)
+
+def test_find_env_file_searches_parent_directories(tmp_path):
+    """A .env file in a parent directory is found, like find_dotenv()"""
+    nested = tmp_path / 'backend' / 'app'
+    nested.mkdir(parents=True)
+    (tmp_path / '.env').write_text('SECRET_KEY=test\n')
+
+    assert find_env_file(str(nested)) == str(tmp_path / '.env')
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+from flask_jwt_extended import create_access_token
+from PIL import Image as PILImage
+
+from app import create_app
+from app.models.image import Image
+from app.models.upload_session import UploadSession
+from app.models.user import User
+
+CHUNK_SIZE = 1024
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App with every storage location under tmp_path and rate limiting off"""
+    monkeypatch.setenv('RATE_LIMIT_ENABLED', '0')
+    monkeypatch.setattr(User, 'USERS_FILE', str(tmp_path / 'users.json'))
+    monkeypatch.setattr(Image, 'IMAGES_FILE', str(tmp_path / 'images.json'))
+    monkeypatch.setattr(UploadSession, 'SESSIONS_DIR', str(tmp_path / 'upload_sessions'))
+
+    app = create_app()
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    app.config['UPLOAD_STAGING_FOLDER'] = str(tmp_path / 'uploads' / '.staging')
+    app.config['UPLOAD_CHUNK_SIZE'] = CHUNK_SIZE
+    os.makedirs(app.config['UPLOAD_STAGING_FOLDER'])
+    return app
+
+@pytest.fixture
+def client(app):
+    """Test client sending a valid JWT for a registered user"""
+    user = User(username='tester', email='tester@example.com', password='secret')
+    user.save()
+    with app.app_context():
+        token = create_access_token(identity=user.id)
+
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+def _png_bytes():
+    """A PNG a few chunks long"""
+    buffer = io.BytesIO()
+    PILImage.frombytes('RGB', (32, 32), os.urandom(32 * 32 * 3)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def _create(client, data, checksum=None, filename='photo.png'):
+    """Start an upload session for data"""
+    return client.post('/api/uploads/sessions', json={
+        'filename': filename,
+        'total_size': len(data),
+        'checksum': checksum or hashlib.sha256(data).hexdigest(),
+        'title': 'Photo'
+    })
+
+def _content_range(data, start):
+    """Content-Range header for the chunk starting at start"""
+    end = min(start + CHUNK_SIZE, len(data)) - 1
+    return {'Content-Range': f'bytes {start}-{end}/{len(data)}'}
+
+def _put(client, session_id, data, start):
+    """Send data[start:start + CHUNK_SIZE] as one chunk"""
+    return client.put(f'/api/uploads/sessions/{session_id}', data=data[start:start + CHUNK_SIZE],
+                      headers=_content_range(data, start))
+
+def test_resumable_upload(app, client):
+    data = _png_bytes()
+    assert len(data) > 2 * CHUNK_SIZE
+
+    response = _create(client, data)
+    assert response.status_code == 201
+    session_id = response.json['id']
+
+    assert _put(client, session_id, data, 0).json['offset'] == CHUNK_SIZE
+
+    # A retried chunk is rejected with the current progress so the client can resume
+    response = _put(client, session_id, data, 0)
+    assert response.status_code == 409
+    assert response.json['offset'] == CHUNK_SIZE
+
+    # A body shorter than its Content-Range is dropped entirely
+    response = client.put(f'/api/uploads/sessions/{session_id}', headers=_content_range(data, CHUNK_SIZE),
+                          input_stream=io.BytesIO(data[CHUNK_SIZE:CHUNK_SIZE + 10]),
+                          content_length=CHUNK_SIZE)
+    assert response.status_code == 400
+    assert client.get(f'/api/uploads/sessions/{session_id}').json['offset'] == CHUNK_SIZE
+
+    offset = CHUNK_SIZE
+    while offset < len(data):
+        response = _put(client, session_id, data, offset)
+        assert response.status_code == 200
+        offset = response.json['offset']
+    assert response.json['complete']
+
+    response = client.post(f'/api/uploads/sessions/{session_id}/complete')
+    assert response.status_code == 201
+    stored = Image.get_by_id(response.json['image']['id'])
+    assert os.path.dirname(stored.path) == app.config['UPLOAD_FOLDER']
+    assert os.listdir(app.config['UPLOAD_STAGING_FOLDER']) == []
+
+    # The session is gone, so late chunks and status queries get a 404
+    assert client.get(f'/api/uploads/sessions/{session_id}').status_code == 404
+    assert _put(client, session_id, data, 0).status_code == 404
+
+def test_checksum_mismatch_resets_the_upload(client):
+    data = _png_bytes()[:CHUNK_SIZE]
+    session_id = _create(client, data, checksum='0' * 64).json['id']
+    assert _put(client, session_id, data, 0).status_code == 200
+
+    response = client.post(f'/api/uploads/sessions/{session_id}/complete')
+
+    assert response.status_code == 409
+    assert response.json['offset'] == 0
+    assert _put(client, session_id, data, 0).status_code == 200
+
+def test_incomplete_upload_cannot_be_completed(client):
+    data = _png_bytes()
+    session_id = _create(client, data).json['id']
+    _put(client, session_id, data, 0)
+
+    response = client.post(f'/api/uploads/sessions/{session_id}/complete')
+
+    assert response.status_code == 409
+    assert response.json['offset'] == CHUNK_SIZE
+
+def test_unusable_filename_is_rejected_up_front(client):
+    """Names secure_filename() can't keep fail at creation, not after the upload"""
+    response = _create(client, b'data', filename='日本.jpg')
+
+    assert response.status_code == 400
+
+def test_abort_discards_received_bytes(app, client):
+    data = _png_bytes()
+    session_id = _create(client, data).json['id']
+    _put(client, session_id, data, 0)
+
+    assert client.delete(f'/api/uploads/sessions/{session_id}').status_code == 200
+    assert os.listdir(app.config['UPLOAD_STAGING_FOLDER']) == []
+    assert _put(client, session_id, data, CHUNK_SIZE).status_code == 404
+
+@pytest.mark.skipif(os.name != 'posix', reason='flock is only used on POSIX')
+def test_chunks_wait_for_other_processes(client):
+    """An append waits for a flock held elsewhere (e.g. by another worker) on the staging file"""
+    import fcntl
+
+    data = _png_bytes()
+    session_id = _create(client, data).json['id']
+    responses = []
+
+    with open(UploadSession.get_by_id(session_id).staging_path, 'rb') as staging:
+        fcntl.flock(staging, fcntl.LOCK_EX)
+        writer = threading.Thread(target=lambda: responses.append(_put(client, session_id, data, 0)))
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()
+        fcntl.flock(staging, fcntl.LOCK_UN)
+
+    writer.join()
+    assert responses[0].json['offset'] == CHUNK_SIZE